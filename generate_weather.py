@@ -1,22 +1,42 @@
 import arrow
 import argparse
 import json
+import numpy
 import os
-import pytz
+import secrets
 import sys
 
 from arrow.parser import ParserError
 from colorama import Fore, init, deinit
 from jsonschema import validate, ValidationError
-from random import uniform
-from timezonefinder import TimezoneFinder
 
-from weathersimulator.weather import WeatherCondition
+from weathersimulator.catalogue import InvalidLocationsError, LocationCatalogue
+from weathersimulator.pipeline import WeatherPipeline
+from weathersimulator.query import create_weather_condition
+from weathersimulator.sampling import READING_STREAMS, TEMPERATURE_STREAM, epoch_seconds, reading_keys, \
+    reading_uniforms
+from weathersimulator.utils.timezones import get_timezone
 from pkg_resources import get_distribution
 
 DEFAULT_DATA_FILE = 'data/locations.json'
 DEFAULT_START_DATE = '1970-01-01 00:00:00'
 DEFAULT_END_DATE = '1970-03-31 00:00:00'
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_QUEUE_DEPTH = 8
+DEFAULT_WRITERS = 1
+DEFAULT_COMPRESS_LEVEL = 6
+
+# Tiles never span calendar months, as the temperature ranges are monthly.
+MAX_CHUNK_DAYS = 31
+
+# Peak size of the working arrays for a single reading in a tile. This is reached while the random numbers are derived,
+# when the key is held alongside the mixed streams and the one temporary of the same size that mixing them needs.
+BYTES_PER_READING = 8 * (1 + 2 * READING_STREAMS)
+
+# Approximate size of a single reading waiting in the pipeline - the calculated WeatherCondition with its random numbers
+# and local date (measured at around 780 bytes with tracemalloc), plus its formatted output row. Rounded up for
+# headroom.
+BYTES_PER_BATCH_ROW = 1024
 
 actual_start_date = None
 actual_end_date = None
@@ -41,6 +61,46 @@ def init_arg_parser():
     parser.add_argument('-e', '--end', help='Ending date for the generated weather data.', action='store', dest='end',
                         metavar='DD/MM/YYYY', default=DEFAULT_END_DATE)
 
+    parser.add_argument('-o', '--output',
+                        help='File to write the generated weather data to. Files ending in .gz are gzip compressed '
+                             '(default: stdout).',
+                        action='store', dest='output', metavar='FILE', default=None)
+
+    parser.add_argument('--batch-size', help='Number of readings per batch (default: {0}).'.format(DEFAULT_BATCH_SIZE),
+                        action='store', dest='batch_size', metavar='N', type=int, default=DEFAULT_BATCH_SIZE)
+
+    parser.add_argument('--queue-depth',
+                        help='Maximum number of batches waiting to be written (default: {0}).'.format(
+                            DEFAULT_QUEUE_DEPTH),
+                        action='store', dest='queue_depth', metavar='N', type=int, default=DEFAULT_QUEUE_DEPTH)
+
+    parser.add_argument('--writers', help='Number of writer threads (default: {0}).'.format(DEFAULT_WRITERS),
+                        action='store', dest='writers', metavar='N', type=int, default=DEFAULT_WRITERS)
+
+    parser.add_argument('--ensemble',
+                        help='Number of independently seeded realizations to generate. Adds a member id column to '
+                             'the output.',
+                        action='store', dest='ensemble', metavar='N', type=int, default=None)
+
+    parser.add_argument('--seed', help='Seed used to make the generated weather data reproducible.', action='store',
+                        dest='seed', metavar='N', type=int, default=None)
+
+    parser.add_argument('--chunk-days',
+                        help='Maximum number of days generated at a time (default: {0}). Tiles never span calendar '
+                             'months.'.format(MAX_CHUNK_DAYS),
+                        action='store', dest='chunk_days', metavar='N', type=int, default=None)
+
+    parser.add_argument('--chunk-locations', help='Maximum number of locations generated at a time (default: all).',
+                        action='store', dest='chunk_locations', metavar='N', type=int, default=None)
+
+    parser.add_argument('--memory-budget',
+                        help='Approximate limit on the memory used by readings in flight, in megabytes. Covers the '
+                             'working arrays for a tile and the batches waiting to be written, and reduces the batch '
+                             'and chunk sizes when needed.',
+                        action='store', dest='memory_budget', metavar='MB', type=int, default=None)
+
+    parser.add_argument('--stats', help='print pipeline stall metrics to stderr on completion', action='store_true')
+
     return parser
 
 
@@ -49,11 +109,11 @@ def get_script_path():
 
 def validate_data_file(data_file):
     """
-    Verifies that the data file is accessible and in the correct format.
+    Verifies that the data file is accessible and in the correct format, and loads its locations.
 
     :param data_file: Relative or absolute path to the data file containing location information.
 
-    :return: None
+    :return: Returns a LocationCatalogue of the validated locations.
     """
     if not os.path.isfile(data_file):
         print(Fore.RED + 'Unable to locate data file - {0}.'.format(data_file))
@@ -73,6 +133,12 @@ def validate_data_file(data_file):
         print(Fore.RED + 'Data file is corrupt or not in the correct format - {0}\n{1}'.format(data_file, jve.message))
         exit(0)
 
+    try:
+        return LocationCatalogue(location_records)
+    except InvalidLocationsError as ile:
+        print(Fore.RED + 'Data file contains invalid locations - {0}\n{1}'.format(data_file, ile))
+        exit(0)
+
 
 def validate_args(args):
     """
@@ -80,14 +146,15 @@ def validate_args(args):
 
     :param args: User provided arguments.
 
-    :return: Returns a dictionary containing the validated user arguments, including any default args.
+    :return: Returns a dictionary containing the validated user arguments, including any default args and the
+        LocationCatalogue loaded from the data file.
     """
     if args.version:
         print('Simple Weather Simulator {0}'.format(get_distribution(__name__).version))
         exit(0)
 
     absolute_path = os.path.abspath(args.file) if args.file else os.path.abspath(DEFAULT_DATA_FILE)
-    validate_data_file(absolute_path)
+    args.catalogue = validate_data_file(absolute_path)
 
     try:
         start_date = arrow.get(args.start)
@@ -101,45 +168,286 @@ def validate_args(args):
         print(Fore.RED + 'End date should be in the format YYYY-MM-DD HH:mm:ss')
         exit(0)
 
+    for name in ('batch_size', 'queue_depth', 'writers'):
+        if getattr(args, name) < 1:
+            print(Fore.RED + '--{0} must be at least 1'.format(name.replace('_', '-')))
+            exit(0)
+
+    for name in ('ensemble', 'chunk_days', 'chunk_locations', 'memory_budget'):
+        if getattr(args, name) is not None and getattr(args, name) < 1:
+            print(Fore.RED + '--{0} must be at least 1'.format(name.replace('_', '-')))
+            exit(0)
+
     return args
 
 
-def generate(start_date, end_date, data_file):
+def get_timezones(catalogue):
     """
-    Generates the weather data and outputs to stdout.
+    Resolves the timezone of every location in the catalogue.
 
-    :param data_file: Absolute path to the source data file.
-    :param start_date: The starting date to begin generating weather data for.
-    :param end_date: The end date to stop generating weather date for.
+    :param catalogue: The LocationCatalogue to resolve timezones for.
+
+    :return: Returns a list of pytz timezones, in the same order as the catalogue records.
     """
-    location_records = []
+    return [get_timezone(location['latitude'], location['longitude']) for location in catalogue.records]
 
-    with open(data_file) as location_file:
-        location_records = json.load(location_file)
 
+def get_month_blocks(start_date, end_date, max_days=None):
+    """
+    Splits the date range into blocks of consecutive days that fall within the same calendar month.
+
+    :param start_date: The starting date of the range.
+    :param end_date: The end date of the range (inclusive).
+    :param max_days: Optional maximum number of days in each block. Months are split into several blocks when needed.
+
+    :return: Yields a list of dates for each block in the range.
+    """
+    block = []
     current_date = start_date
 
     while current_date <= end_date:
-        current_month = current_date.datetime.month - 1
+        if block and (current_date.month != block[0].month or len(block) == max_days):
+            yield block
+            block = []
+
+        block.append(current_date)
+        current_date = current_date.shift(days=1)
+
+    if block:
+        yield block
+
+
+def get_tile_shape(locations, members, chunk_days=None, chunk_locations=None, memory_budget=None):
+    """
+    Works out how many days and locations are generated at a time. Explicit chunk sizes are treated as upper limits,
+    which are reduced further when the tile would not fit within the memory budget.
+
+    :param locations: The number of locations in the catalogue.
+    :param members: The number of ensemble members.
+    :param chunk_days: Optional maximum number of days per tile (default: a calendar month).
+    :param chunk_locations: Optional maximum number of locations per tile (default: every location).
+    :param memory_budget: Optional maximum size of a tile's working arrays, in bytes.
+
+    :return: Returns a (days, locations) tuple.
+    """
+    days = min(chunk_days or MAX_CHUNK_DAYS, MAX_CHUNK_DAYS)
+    locations = max(1, min(chunk_locations or locations, locations))
+
+    if memory_budget:
+        readings = max(1, memory_budget // (BYTES_PER_READING * members))
+
+        if days * locations > readings:
+            days = max(1, min(days, readings // locations))
+
+        if days * locations > readings:
+            locations = max(1, readings // days)
+
+    return days, locations
+
+
+def get_tile_readings(catalogue, seed, members, timestamps, locations, month):  # pylint: disable=R0913
+    """
+    Derives the random numbers and temperatures for every member and location in a tile, in one go.
+
+    :param catalogue: The LocationCatalogue to generate weather data for.
+    :param seed: The integer seed of the run.
+    :param members: The number of ensemble members.
+    :param timestamps: int64 array of the days in the tile, in seconds since the Unix epoch.
+    :param locations: Slice selecting the locations in the tile.
+    :param month: The calendar month (1 - 12) that the tile falls in.
+
+    :return: Returns a (keys, uniforms, temperatures) tuple of arrays, indexed by day, member and location. Uniforms has
+        an extra trailing dimension of READING_STREAMS random numbers.
+    """
+    keys = reading_keys(seed, numpy.arange(members)[None, :, None], catalogue.keys[None, None, locations],
+                        timestamps[:, None, None])
+    uniforms = reading_uniforms(keys)
+    temperatures = catalogue.scale_temperatures(month, uniforms[..., TEMPERATURE_STREAM], locations=locations)
+
+    return keys, uniforms, temperatures
+
+
+def get_batch_size(batch_size, queue_depth, writers, memory_budget=None):
+    """
+    Works out how many readings are handed to the writers at a time. Up to queue_depth batches can be waiting in the
+    queue, with one more held by each writer and another being filled, so the batch size is reduced when those
+    batches would take up more than half of the memory budget.
+
+    :param batch_size: The requested number of readings per batch.
+    :param queue_depth: The maximum number of batches waiting to be written.
+    :param writers: The number of writer threads.
+    :param memory_budget: Optional limit on the memory used by readings in flight, in bytes.
+
+    :return: Returns the number of readings per batch.
+    """
+    if not memory_budget:
+        return batch_size
+
+    batches = queue_depth + writers + 1
+
+    return max(1, min(batch_size, memory_budget // (2 * batches * BYTES_PER_BATCH_ROW)))
+
+
+def generate_batches(catalogue, timezones, start_date, end_date, batch_size, seed,  # pylint: disable=R0913,R0914
+                     members=1, tile_shape=None):
+    """
+    Generates the weather data in batches, for each ensemble member.
+
+    Every reading takes its random numbers from a hash of the seed, member, location and timestamp, so any reading can
+    be reproduced on its own with weathersimulator.query.weather_at().
+
+    Work is split into tiles of days and locations, which are generated one at a time so memory use doesn't grow with
+    the length of the date range or the size of the catalogue. Batches never span tiles. Within a tile, readings are
+    ordered by day, member and location.
+
+    :param catalogue: The LocationCatalogue to generate weather data for.
+    :param timezones: The timezone of each location in the catalogue.
+    :param start_date: The starting date to begin generating weather data for.
+    :param end_date: The end date to stop generating weather date for.
+    :param batch_size: The maximum number of weather conditions in each batch.
+    :param seed: The integer seed of the run.
+    :param members: The number of ensemble members.
+    :param tile_shape: Optional (days, locations) tuple, as returned by get_tile_shape(). Defaults to a calendar month
+        of every location.
+
+    :return: Yields lists of (member id, calculated WeatherCondition) tuples.
+    """
+    chunk_days, chunk_locations = tile_shape or get_tile_shape(len(catalogue), members)
+
+    for tile_dates in get_month_blocks(start_date, end_date, max_days=chunk_days):
+        timestamps = numpy.array([epoch_seconds(current_date) for current_date in tile_dates], dtype=numpy.int64)
+
+        for first in range(0, len(catalogue), chunk_locations):
+            locations = slice(first, min(first + chunk_locations, len(catalogue)))
+
+            keys, uniforms, temperatures = get_tile_readings(catalogue, seed, members, timestamps, locations,
+                                                             tile_dates[0].month)
+            batch = []
+
+            for day, current_date in enumerate(tile_dates):
+                local_dates = [current_date.astimezone(timezone) for timezone in timezones[locations]]
+
+                for member in range(members):
+                    for index, location in enumerate(catalogue.records[locations]):
+                        # Plain Python values are passed on, so the readings don't keep the tile arrays alive
+                        # once they have been queued.
+                        tile_index = (day, member, index)
+                        weather_condition = create_weather_condition(location, temperatures[tile_index],
+                                                                     local_dates[index], int(keys[tile_index]),
+                                                                     uniforms[tile_index].tolist())
+                        batch.append((member, weather_condition))
+
+                        if len(batch) >= batch_size:
+                            yield batch
+                            batch = []
+
+            if batch:
+                yield batch
+
+            # Release this tile's arrays before the next tile's are derived, so only one tile is held at a time.
+            del keys, uniforms, temperatures, batch
+
+
+def format_row(item):
+    """
+    Formats a single reading for output.
+
+    :param item: A (member id, WeatherCondition) tuple.
+
+    :return: Returns the weather condition in flat-file format.
+    """
+    return str(item[1])
+
+
+def format_member_row(item):
+    """
+    Formats a single ensemble reading for output, prefixed with the member id.
+
+    :param item: A (member id, WeatherCondition) tuple.
+
+    :return: Returns the member id and weather condition in flat-file format.
+    """
+    return f'{item[0]}|{item[1]}'
 
-        for location in location_records:
-            tf = TimezoneFinder()
-            timezone_str = tf.timezone_at(lng=location['longitude'], lat=location['latitude'])
-            tz = pytz.timezone(timezone_str)
 
-            weather_condition = WeatherCondition(
-                name=location['name'],
-                latitude=location['latitude'],
-                longitude=location['longitude'],
-                elevation=location['elevation'],
-                temperature=uniform(location['temps']['min'][current_month], location['temps']['max'][current_month]),
-                datetime = current_date.astimezone(tz)
-            )
+def open_output(output_file):
+    """
+    Opens the file that weather data is written to.
+
+    :param output_file: Relative or absolute path to the output file. When None, stdout is used.
+
+    :return: Returns a writable file object. Files ending in .gz are opened in binary mode, as the writer threads
+        compress each batch themselves.
+    """
+    if not output_file:
+        return sys.stdout
+
+    if is_compressed(output_file):
+        return open(output_file, 'wb')
+
+    return open(output_file, 'w')
+
+
+def is_compressed(output_file):
+    """
+    Checks whether the output file should be gzip compressed.
+
+    :param output_file: Relative or absolute path to the output file, or None for stdout.
+
+    :return: Returns True when the file name ends in .gz.
+    """
+    return bool(output_file) and output_file.endswith('.gz')
+
+
+def generate(start_date, end_date, catalogue, output=None, batch_size=DEFAULT_BATCH_SIZE,  # pylint: disable=R0913
+             queue_depth=DEFAULT_QUEUE_DEPTH, writers=DEFAULT_WRITERS, ensemble=None, seed=None, chunk_days=None,
+             chunk_locations=None, memory_budget=None, compresslevel=None):
+    """
+    Generates the weather data and writes it to the output stream. Weather conditions are calculated in the calling
+    thread, while formatting and writing is done by the writer threads.
+
+    :param start_date: The starting date to begin generating weather data for.
+    :param end_date: The end date to stop generating weather date for.
+    :param catalogue: The LocationCatalogue to generate weather data for.
+    :param output: Optional file-like object to write to (default: stdout).
+    :param batch_size: The number of weather conditions handed to the writers at a time.
+    :param queue_depth: The maximum number of batches waiting to be written.
+    :param writers: The number of writer threads.
+    :param ensemble: Optional number of independently seeded realizations to generate. Each reading is prefixed with
+        the id (0 to N - 1) of the member it belongs to.
+    :param seed: Optional seed, used to make the generated data reproducible. When omitted, a random seed is used.
+    :param chunk_days: Optional maximum number of days generated at a time.
+    :param chunk_locations: Optional maximum number of locations generated at a time.
+    :param memory_budget: Optional limit on the memory used by readings in flight, in bytes. The batches waiting to be
+        written are limited to half of it, and the tiles use what remains.
+    :param compresslevel: Optional gzip compression level. When given, the writer threads compress each batch and
+        output must be opened in binary mode.
+
+    :return: Returns a PipelineStats instance describing the run, including the seed that was used.
+    """
+    # Timezones are resolved once, and shared by every ensemble member.
+    timezones = get_timezones(catalogue)
+    seed = seed if seed is not None else secrets.randbits(63)
+
+    pipeline = WeatherPipeline(output or sys.stdout, queue_depth=queue_depth, writers=writers,
+                               formatter=format_member_row if ensemble else format_row, compresslevel=compresslevel)
+
+    members = ensemble or 1
+    batch_size = get_batch_size(batch_size, queue_depth, writers, memory_budget)
 
-            weather_condition.calculate()
-            print(weather_condition)
+    if memory_budget:
+        memory_budget = max(1, memory_budget - (queue_depth + writers + 1) * batch_size * BYTES_PER_BATCH_ROW)
 
-        current_date = current_date.replace(days=1)
+    tile_shape = get_tile_shape(len(catalogue), members, chunk_days, chunk_locations, memory_budget)
+
+    # Month boundaries are taken in UTC, to match weathersimulator.query.weather_at().
+    batches = generate_batches(catalogue, timezones, start_date.to('utc'), end_date.to('utc'), batch_size, seed,
+                               members=members, tile_shape=tile_shape)
+
+    stats = pipeline.run(batches)
+    stats.seed = seed
+
+    return stats
 
 
 def main():
@@ -157,7 +465,27 @@ def main():
     start_date = arrow.get(args.start)
     end_date = arrow.get(args.end)
 
-    generate(start_date, end_date, args.file)
+    # Report the seed when one is picked at random, so any reading in the output can be reproduced with weather_at().
+    seed = args.seed
+
+    if seed is None:
+        seed = secrets.randbits(63)
+        print('Seed: {0}'.format(seed), file=sys.stderr)
+
+    output = open_output(args.output)
+
+    try:
+        stats = generate(start_date, end_date, args.catalogue, output=output, batch_size=args.batch_size,
+                         queue_depth=args.queue_depth, writers=args.writers, ensemble=args.ensemble, seed=seed,
+                         chunk_days=args.chunk_days, chunk_locations=args.chunk_locations,
+                         memory_budget=args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+                         compresslevel=DEFAULT_COMPRESS_LEVEL if is_compressed(args.output) else None)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.stats:
+        print(stats, file=sys.stderr)
 
     deinit()
 
@@ -1,3 +1,5 @@
+import random
+
 from nose.tools import assert_equal, assert_raises
 from weathersimulator.weather import WeatherCondition
 
@@ -81,3 +83,35 @@ def test_WeatherCondition_init_longitude_is_range_bound():
 
 
 
+def test_WeatherCondition_init_rng_makes_results_reproducible():
+    results = []
+
+    for _ in range(2):
+        wc = WeatherCondition(latitude=-32.4566, longitude=158.246912, elevation=345, temperature=15,
+                              rng=random.Random(42))
+        wc.calculate()
+        results.append((wc.pressure, wc.humidity, wc.condition))
+
+    assert_equal(results[0], results[1])
+
+
+def test_WeatherCondition_init_negative_coordinates_are_range_bound():
+    with assert_raises(TypeError, ) as te:
+        wc = WeatherCondition(name='MyCity', latitude=-90.5, longitude=158.246912, elevation=345, temperature=15)
+
+    with assert_raises(TypeError, ) as te:
+        wc = WeatherCondition(name='MyCity', latitude=-32.4566, longitude=-180.5, elevation=345, temperature=15)
+
+    wc = WeatherCondition(name='MyCity', latitude=-90.0, longitude=-180.0, elevation=345, temperature=15)
+    assert_equal(wc.latitude, -90.0)
+
+
+def test_WeatherCondition_trusted_matches_validated_instance():
+    wc1 = WeatherCondition(name='MyCity', latitude=-32.4566, longitude=158.246912, elevation=345, temperature=15,
+                           rng=random.Random(42))
+    wc2 = WeatherCondition.trusted(name='MyCity', latitude=-32.4566, longitude=158.246912, elevation=345,
+                                   temperature=15, datetime=wc1.datetime, rng=random.Random(42))
+    wc1.calculate()
+    wc2.calculate()
+
+    assert_equal(str(wc1), str(wc2))
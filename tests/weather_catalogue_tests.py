@@ -0,0 +1,54 @@
+import json
+import os
+import numpy
+
+from nose.tools import assert_equal, assert_raises, assert_true
+from weathersimulator.catalogue import InvalidLocationsError, LocationCatalogue, validate_locations
+from weathersimulator.sampling import TEMPERATURE_STREAM, reading_keys, reading_uniforms
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'locations.json')
+
+
+def test_catalogue_loads_monthly_temperature_arrays():
+    catalogue = LocationCatalogue.from_file(DATA_FILE)
+
+    assert_equal(catalogue.min_temps.shape, (len(catalogue), 12))
+    assert_equal(catalogue.max_temps.shape, (len(catalogue), 12))
+
+    assert_equal(catalogue.names[0], 'Sydney')
+    assert_equal(catalogue.min_temps[0, 0], 10.6)
+    assert_equal(catalogue.max_temps[0, 11], 42.2)
+
+
+def test_catalogue_scale_temperatures_is_within_monthly_range():
+    catalogue = LocationCatalogue.from_file(DATA_FILE)
+
+    keys = reading_keys(1, 0, catalogue.keys[None, :], numpy.arange(31)[:, None] * 86400)
+    temperatures = catalogue.scale_temperatures(7, reading_uniforms(keys)[..., TEMPERATURE_STREAM])
+
+    assert_equal(temperatures.shape, (31, len(catalogue)))
+    assert_true(((temperatures >= catalogue.min_temps[:, 6]) & (temperatures <= catalogue.max_temps[:, 6])).all())
+
+
+def test_catalogue_scale_temperatures_maps_uniforms_onto_monthly_range():
+    catalogue = LocationCatalogue.from_file(DATA_FILE)
+
+    assert_true((catalogue.scale_temperatures(3, numpy.zeros(len(catalogue))) == catalogue.min_temps[:, 2]).all())
+    assert_equal(catalogue.scale_temperatures(3, numpy.full((5, len(catalogue)), 0.5)).shape, (5, len(catalogue)))
+
+
+def test_catalogue_reports_every_invalid_location():
+    with open(DATA_FILE) as location_file:
+        records = json.load(location_file)
+
+    records[1]['latitude'] = -95.0
+    records[1]['elevation'] = '25'
+    records[3]['longitude'] = 181.0
+    records[4]['temps']['min'][0] = 99.0
+
+    with assert_raises(InvalidLocationsError, ) as ile:
+        LocationCatalogue(records)
+
+    assert_equal(ile.exception.errors, validate_locations(records))
+    assert_equal([(row, field) for row, field, _ in ile.exception.errors],
+                 [(1, 'latitude'), (1, 'elevation'), (3, 'longitude'), (4, 'temps')])
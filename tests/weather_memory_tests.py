@@ -0,0 +1,121 @@
+import os
+import subprocess
+import sys
+import tracemalloc
+import arrow
+import numpy
+
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_equal, assert_less, assert_less_equal
+from generate_weather import BYTES_PER_BATCH_ROW, BYTES_PER_READING, generate, get_batch_size, get_month_blocks, \
+    get_tile_readings, get_tile_shape, get_timezones
+from weathersimulator.catalogue import LocationCatalogue
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DATA_FILE = os.path.join(ROOT_DIR, 'tests', 'data', 'locations.json')
+
+# Runs generate() in a fresh interpreter, discarding the output, and prints the peak resident set size in kilobytes.
+PEAK_RSS_SCRIPT = '''
+import os, resource, sys
+import arrow
+from generate_weather import generate
+from weathersimulator.catalogue import LocationCatalogue
+
+with open(os.devnull, 'w') as output:
+    generate(arrow.get(sys.argv[1]), arrow.get(sys.argv[2]), LocationCatalogue.from_file(sys.argv[3]), output=output,
+             seed=1, chunk_days=7, chunk_locations=5)
+
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def get_peak_rss(start_date, end_date):
+    output = subprocess.check_output([sys.executable, '-c', PEAK_RSS_SCRIPT, start_date, end_date, DATA_FILE],
+                                     cwd=ROOT_DIR)
+
+    return int(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def test_peak_rss_is_flat_as_date_range_grows():
+    if resource is None:
+        raise SkipTest('resource module is not available on this platform')
+
+    short_range = get_peak_rss('1970-01-01 00:00:00', '1970-06-30 00:00:00')
+    long_range = get_peak_rss('1970-01-01 00:00:00', '1975-12-31 00:00:00')
+
+    # Twelve times as many readings should fit in (almost) the same amount of memory.
+    assert_less(long_range, short_range * 1.1)
+
+
+def test_tile_shape_is_reduced_to_fit_memory_budget():
+    assert_equal(get_tile_shape(100, 1), (31, 100))
+    assert_equal(get_tile_shape(100, 1, chunk_days=7, chunk_locations=10), (7, 10))
+    assert_equal(get_tile_shape(100, 2, memory_budget=BYTES_PER_READING * 2 * 500), (5, 100))
+    assert_equal(get_tile_shape(100, 1, memory_budget=BYTES_PER_READING * 50), (1, 50))
+
+
+def test_month_blocks_are_split_by_chunk_days():
+    blocks = list(get_month_blocks(arrow.get('1970-01-25'), arrow.get('1970-02-10'), max_days=5))
+
+    assert_equal([len(block) for block in blocks], [5, 2, 5, 5])
+    assert_equal(blocks[1][-1].month, 1)
+    assert_equal(blocks[2][0].month, 2)
+
+
+def get_large_catalogue(copies):
+    """
+    Builds a catalogue with copies of every test location. Only the names differ, so the timezone cache is reused.
+    """
+    records = LocationCatalogue.from_file(DATA_FILE).records
+
+    return LocationCatalogue([dict(location, name='{0} {1}'.format(location['name'], copy))
+                              for copy in range(copies) for location in records])
+
+
+def test_tile_readings_fit_bytes_per_reading():
+    catalogue = get_large_catalogue(50)
+    timestamps = numpy.arange(7, dtype=numpy.int64) * 86400
+
+    tracemalloc.start()
+
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tile = get_tile_readings(catalogue, 1, 3, timestamps, slice(None), 1)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert_equal(tile[1].shape, (7, 3, len(catalogue), 5))
+    # Allow for the array headers, which don't grow with the size of the tile.
+    assert_less_equal(peak - baseline, BYTES_PER_READING * 7 * 3 * len(catalogue) + 4096)
+
+
+def test_batch_size_is_reduced_to_fit_memory_budget():
+    assert_equal(get_batch_size(1000, 8, 1), 1000)
+    assert_equal(get_batch_size(1000, 8, 1, memory_budget=BYTES_PER_BATCH_ROW * 2 * 10 * 100), 100)
+    assert_equal(get_batch_size(1000, 8, 1, memory_budget=1), 1)
+
+
+def test_generate_stays_within_memory_budget():
+    catalogue = get_large_catalogue(100)
+    get_timezones(catalogue)
+    memory_budget = 1024 * 1024
+
+    with open(os.devnull, 'w') as output:
+        tracemalloc.start()
+
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            stats = generate(arrow.get('1970-01-01 00:00:00'), arrow.get('1970-01-10 00:00:00'), catalogue,
+                             output=output, seed=1, memory_budget=memory_budget)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert_equal(stats.rows, 10 * len(catalogue))
+    assert_less_equal(peak - baseline, memory_budget)
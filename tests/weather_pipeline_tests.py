@@ -0,0 +1,63 @@
+import gzip
+import io
+
+from nose.tools import assert_equal, assert_raises
+from weathersimulator.pipeline import WeatherPipeline
+
+
+def test_pipeline_writes_batches_in_order():
+    batches = [[f'row-{batch}-{row}' for row in range(5)] for batch in range(50)]
+    expected = ''.join(f'{row}\n' for batch in batches for row in batch)
+
+    for writers in (1, 4):
+        output = io.StringIO()
+        stats = WeatherPipeline(output, queue_depth=2, writers=writers).run(iter(batches))
+
+        assert_equal(output.getvalue(), expected)
+        assert_equal(stats.batches, 50)
+        assert_equal(stats.rows, 250)
+
+
+def test_pipeline_queue_depth_is_bounded():
+    stats = WeatherPipeline(io.StringIO(), queue_depth=3).run([['row']] * 100)
+
+    assert_equal(stats.max_queue_depth <= 3, True)
+
+
+def test_pipeline_invalid_settings_throws_ValueError():
+    with assert_raises(ValueError, ) as ve:
+        WeatherPipeline(io.StringIO(), queue_depth=0)
+
+    with assert_raises(ValueError, ) as ve:
+        WeatherPipeline(io.StringIO(), writers=0)
+
+
+def test_pipeline_writer_error_is_raised():
+    class BrokenOutput(object):
+        def write(self, data):
+            raise IOError('disk full')
+
+    with assert_raises(IOError, ) as ioe:
+        WeatherPipeline(BrokenOutput(), queue_depth=1, writers=2).run([['row']] * 100)
+
+
+def test_pipeline_uses_formatter():
+    output = io.StringIO()
+    WeatherPipeline(output, formatter=lambda item: f'{item[0]}|{item[1]}').run([[(0, 'a'), (1, 'b')]])
+
+    assert_equal(output.getvalue(), '0|a\n1|b\n')
+
+
+def test_pipeline_compresses_batches_in_writer_threads():
+    batches = [[f'row-{batch}-{row}' for row in range(5)] for batch in range(50)]
+    expected = ''.join(f'{row}\n' for batch in batches for row in batch)
+
+    output = io.BytesIO()
+    WeatherPipeline(output, queue_depth=2, writers=4, compresslevel=6).run(batches)
+
+    assert_equal(gzip.decompress(output.getvalue()).decode('utf-8'), expected)
+
+
+def test_pipeline_queue_depth_excludes_stop_sentinels():
+    assert_equal(WeatherPipeline(io.StringIO(), writers=3).run([]).max_queue_depth, 0)
+    assert_equal(WeatherPipeline(io.StringIO(), writers=3).run([['row']]).max_queue_depth <= 1, True)
@@ -0,0 +1,70 @@
+import io
+import os
+import arrow
+import pytz
+
+from nose.tools import assert_equal, assert_not_equal
+from generate_weather import generate, generate_batches, get_timezones
+from weathersimulator.catalogue import LocationCatalogue
+from weathersimulator.query import cached_weather_at, weather_at
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'locations.json')
+
+
+def test_weather_at_is_deterministic():
+    location = LocationCatalogue.from_file(DATA_FILE).records[0]
+
+    wc1 = weather_at(location, '1970-06-15 00:00:00', seed=42)
+    wc2 = weather_at(location, '1970-06-15 00:00:00', seed=42)
+    wc3 = weather_at(location, '1970-06-15 00:00:00', seed=43)
+
+    assert_equal(str(wc1), str(wc2))
+    assert_not_equal(str(wc1), str(wc3))
+
+
+def test_weather_at_matches_bulk_generator():
+    catalogue = LocationCatalogue.from_file(DATA_FILE)
+    timezones = get_timezones(catalogue)
+
+    start_date = arrow.get('1970-01-30 00:00:00')
+    end_date = arrow.get('1970-02-02 00:00:00')
+
+    for batch in generate_batches(catalogue, timezones, start_date, end_date, 100, seed=7, members=2):
+        for member, weather_condition in batch:
+            location = catalogue.records[catalogue.names.index(weather_condition.name)]
+            expected = weather_at(location, weather_condition.datetime, seed=7, member=member)
+
+            assert_equal(str(weather_condition), str(expected))
+            assert_equal(weather_condition.humidity, expected.humidity)
+
+
+def test_cached_weather_at_reuses_readings():
+    location = LocationCatalogue.from_file(DATA_FILE).records[0]
+    cached_weather_at.cache_clear()
+
+    wc1 = cached_weather_at(location, '1970-06-15 00:00:00', seed=42)
+    wc2 = cached_weather_at(location, '1970-06-15 00:00:00', seed=42)
+
+    assert_equal(wc1 is wc2, True)
+    assert_equal(cached_weather_at.cache_info().hits, 1)
+    assert_equal(str(wc1), str(weather_at(location, '1970-06-15 00:00:00', seed=42)))
+
+
+def test_cached_weather_at_uses_timezone():
+    location = LocationCatalogue.from_file(DATA_FILE).records[0]
+
+    wc = cached_weather_at(location, '1970-06-15 00:00:00', seed=42, timezone=pytz.utc)
+
+    assert_equal(wc.datetime.utcoffset().total_seconds(), 0)
+    assert_equal(str(wc), str(weather_at(location, '1970-06-15 00:00:00', seed=42, timezone=pytz.utc)))
+
+
+def test_generate_reports_random_seed():
+    output = io.StringIO()
+    catalogue = LocationCatalogue.from_file(DATA_FILE)
+    stats = generate(arrow.get('1970-01-01 00:00:00'), arrow.get('1970-01-01 00:00:00'), catalogue, output=output)
+
+    location = catalogue.records[0]
+    expected = weather_at(location, '1970-01-01 00:00:00', seed=stats.seed)
+
+    assert_equal(output.getvalue().splitlines()[0], str(expected))
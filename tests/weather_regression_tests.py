@@ -0,0 +1,377 @@
+"""
+Statistical regression harness. Generates samples from the reference scalar path (WeatherCondition validated through
+its property setters, with temperatures drawn one at a time using the random module, as generate() originally did)
+and from each optimized path - the bulk generator in generate_weather.py with its default tiles, an ensemble member
+other than the first, small chunked tiles, and weathersimulator.query.weather_at() - then compares the distributions
+of temperature, pressure, humidity and conditions for every location and month.
+
+Each location and month is compared on its own, and again with the comparisons for every location and month combined
+into a single stratified test. The combined tests can detect small differences that affect every group, which are
+too small to show up in any one group.
+
+Run this module from the repository root to print a full report, including the throughput of each path:
+
+    python -m tests.weather_regression_tests [START_DATE] [END_DATE]
+"""
+import datetime
+import math
+import os
+import random
+import sys
+import time
+import arrow
+import mock
+import numpy
+
+from nose.tools import assert_equal, assert_greater, assert_true
+from generate_weather import generate_batches, get_month_blocks, get_tile_shape, get_timezones
+from weathersimulator.catalogue import LocationCatalogue
+from weathersimulator.query import weather_at
+from weathersimulator.weather import WeatherCondition
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'locations.json')
+CONDITIONS = ('Sunny', 'Rainy', 'Snowy')
+MEASURES = ('temperature', 'pressure', 'humidity')
+
+# Family-wise significance level, split across every comparison made (Bonferroni correction).
+SIGNIFICANCE = 0.001
+
+# Number of equally populated bins each measure is split into for the combined tests.
+COMBINED_BINS = 4
+
+
+def ks_2samp(sample_a, sample_b):
+    """
+    Two-sample Kolmogorov-Smirnov test.
+
+    :return: Returns a (statistic, p-value) tuple, using the asymptotic Kolmogorov distribution.
+    """
+    sample_a = numpy.sort(sample_a)
+    sample_b = numpy.sort(sample_b)
+    values = numpy.concatenate([sample_a, sample_b])
+
+    cdf_a = numpy.searchsorted(sample_a, values, side='right') / len(sample_a)
+    cdf_b = numpy.searchsorted(sample_b, values, side='right') / len(sample_b)
+    statistic = numpy.max(numpy.abs(cdf_a - cdf_b))
+
+    effective_n = math.sqrt(len(sample_a) * len(sample_b) / (len(sample_a) + len(sample_b)))
+    lam = (effective_n + 0.12 + 0.11 / effective_n) * statistic
+    p_value = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+
+    return statistic, min(max(p_value, 0.0), 1.0)
+
+
+def chi2_statistic(counts_a, counts_b):
+    """
+    Chi-square statistic of homogeneity for two samples of categorical counts. Categories that are empty in both
+    samples are ignored.
+
+    :return: Returns a (statistic, degrees of freedom) tuple.
+    """
+    table = numpy.array([counts_a, counts_b], dtype=float)
+    table = table[:, table.sum(axis=0) > 0]
+    dof = table.shape[1] - 1
+
+    if dof < 1:
+        return 0.0, 0
+
+    expected = numpy.outer(table.sum(axis=1), table.sum(axis=0)) / table.sum()
+
+    return float(((table - expected) ** 2 / expected).sum()), dof
+
+
+def chi2_p_value(statistic, dof):
+    """
+    Upper tail probability of the chi-square distribution, using the Wilson-Hilferty approximation.
+
+    :return: Returns the p-value.
+    """
+    if dof < 1:
+        return 1.0
+
+    z = ((statistic / dof) ** (1.0 / 3) - (1 - 2.0 / (9 * dof))) / math.sqrt(2.0 / (9 * dof))
+
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def chi2_2samp(counts_a, counts_b):
+    """
+    Chi-square test of homogeneity for two samples of categorical counts.
+
+    :return: Returns a (statistic, p-value) tuple.
+    """
+    statistic, dof = chi2_statistic(counts_a, counts_b)
+
+    return statistic, chi2_p_value(statistic, dof)
+
+
+def binned_counts(sample_a, sample_b, bins=COMBINED_BINS):
+    """
+    Splits two samples of a continuous measure into bins, at the quantiles of both samples combined.
+
+    :return: Returns a (counts_a, counts_b) tuple of bin counts.
+    """
+    edges = numpy.quantile(numpy.concatenate([sample_a, sample_b]), numpy.arange(1, bins) / bins)
+
+    return tuple(numpy.bincount(numpy.searchsorted(edges, sample, side='right'), minlength=bins)
+                 for sample in (sample_a, sample_b))
+
+
+def reference_samples(catalogue, timezones, start_date, end_date, seed):
+    """
+    Generates readings using the reference scalar path.
+
+    :return: Returns a list of calculated WeatherCondition instances, ordered by day then location.
+    """
+    rng = random.Random(seed)
+    readings = []
+
+    for month_dates in get_month_blocks(start_date, end_date):
+        current_month = month_dates[0].month - 1
+
+        for current_date in month_dates:
+            for index, location in enumerate(catalogue.records):
+                weather_condition = WeatherCondition(
+                    name=location['name'],
+                    latitude=location['latitude'],
+                    longitude=location['longitude'],
+                    elevation=location['elevation'],
+                    temperature=rng.uniform(location['temps']['min'][current_month],
+                                            location['temps']['max'][current_month]),
+                    datetime=current_date.astimezone(timezones[index]),
+                    rng=rng
+                )
+
+                weather_condition.calculate()
+                readings.append(weather_condition)
+
+    return readings
+
+
+def bulk_samples(catalogue, timezones, start_date, end_date, seed, members=1, member=0, tile_shape=None):
+    """
+    Generates readings using the optimized bulk path.
+
+    :param member: The ensemble member whose readings are returned.
+
+    :return: Returns a list of calculated WeatherCondition instances.
+    """
+    batches = generate_batches(catalogue, timezones, start_date, end_date, 1000, seed, members=members,
+                               tile_shape=tile_shape or get_tile_shape(len(catalogue), members))
+
+    return [weather_condition for batch in batches for batch_member, weather_condition in batch
+            if batch_member == member]
+
+
+def query_samples(catalogue, timezones, start_date, end_date, seed):
+    """
+    Generates readings one at a time using weather_at().
+
+    :return: Returns a list of calculated WeatherCondition instances.
+    """
+    return [weather_at(location, current_date, seed, timezone=timezones[index])
+            for month_dates in get_month_blocks(start_date, end_date)
+            for current_date in month_dates
+            for index, location in enumerate(catalogue.records)]
+
+
+OPTIMIZED_PATHS = {
+    'optimized': bulk_samples,
+    'member 1': lambda *args: bulk_samples(*args, members=2, member=1),
+    'chunked': lambda *args: bulk_samples(*args, tile_shape=(5, 7)),
+    'weather_at': query_samples,
+}
+
+
+def summarise(readings):
+    """
+    Groups readings by location and by the calendar month (in UTC) that their temperature range was taken from.
+
+    :return: Returns a dictionary of (location name, month) to (temperatures, pressures, humidities, condition counts)
+        tuples.
+    """
+    grouped = {}
+
+    for weather_condition in readings:
+        month = weather_condition.datetime.astimezone(datetime.timezone.utc).month
+        grouped.setdefault((weather_condition.name, month), []).append(weather_condition)
+
+    summaries = {}
+
+    for group, group_readings in grouped.items():
+        measures = [numpy.array([getattr(weather_condition, measure) for weather_condition in group_readings],
+                                dtype=float) for measure in MEASURES]
+        conditions = [sum(weather_condition.condition == condition for weather_condition in group_readings)
+                      for condition in CONDITIONS]
+
+        summaries[group] = tuple(measures) + (conditions,)
+
+    return summaries
+
+
+def compare_summaries(reference, optimized):
+    """
+    Compares the readings of a single optimized path against the reference path.
+
+    :return: Returns a (groups, combined) tuple. Groups is a list of ((location, month), p-values) tuples, one for each
+        location and month, and combined is the p-values of the stratified tests across every group. Both sets of
+        p-values are ordered as temperature, pressure, humidity then conditions.
+    """
+    groups = []
+    combined = [[0.0, 0] for _ in range(len(MEASURES) + 1)]
+
+    for group in sorted(reference):
+        p_values = []
+
+        for index in range(len(MEASURES)):
+            p_values.append(ks_2samp(reference[group][index], optimized[group][index])[1])
+            counts = binned_counts(reference[group][index], optimized[group][index])
+            statistic, dof = chi2_statistic(*counts)
+            combined[index][0] += statistic
+            combined[index][1] += dof
+
+        statistic, dof = chi2_statistic(reference[group][-1], optimized[group][-1])
+        p_values.append(chi2_p_value(statistic, dof))
+        combined[-1][0] += statistic
+        combined[-1][1] += dof
+
+        groups.append((group, tuple(p_values)))
+
+    return groups, tuple(chi2_p_value(statistic, dof) for statistic, dof in combined)
+
+
+def compare(start_date, end_date, seed=1, paths=None):
+    """
+    Generates readings from the reference path and each optimized path, and compares them.
+
+    :param paths: Optional names of the optimized paths to compare (default: every path in OPTIMIZED_PATHS).
+
+    :return: Returns a (results, throughput) tuple. Results is a dictionary of optimized path name to (groups,
+        combined) tuples, as returned by compare_summaries(), and throughput is a dictionary of path name to readings
+        per second.
+    """
+    catalogue = LocationCatalogue.from_file(DATA_FILE)
+    timezones = get_timezones(catalogue)
+
+    samplers = [('reference', reference_samples)] + [(path, OPTIMIZED_PATHS[path]) for path in paths or OPTIMIZED_PATHS]
+    throughput = {}
+    summaries = {}
+
+    for path, sampler in samplers:
+        started = time.perf_counter()
+        readings = sampler(catalogue, timezones, start_date, end_date, seed)
+        throughput[path] = len(readings) / (time.perf_counter() - started)
+        summaries[path] = summarise(readings)
+
+    results = {path: compare_summaries(summaries['reference'], summaries[path]) for path, _ in samplers[1:]}
+
+    return results, throughput
+
+
+def get_threshold(results):
+    """
+    Gets the p-value below which a single comparison fails, after the Bonferroni correction.
+
+    :return: Returns the threshold.
+    """
+    comparisons = sum((len(groups) + 1) * (len(MEASURES) + 1) for groups, _ in results.values())
+
+    return SIGNIFICANCE / comparisons
+
+
+def get_failures(results):
+    """
+    Lists every comparison whose p-value falls below the threshold.
+
+    :return: Returns a list of (path, location, month, measure, p-value) tuples. The location and month are None for
+        the combined tests.
+    """
+    threshold = get_threshold(results)
+    measures = MEASURES + ('conditions',)
+    failures = []
+
+    for path, (groups, combined) in results.items():
+        for (name, month), p_values in groups + [((None, None), combined)]:
+            failures.extend((path, name, month, measure, p_value)
+                            for measure, p_value in zip(measures, p_values) if p_value <= threshold)
+
+    return failures
+
+
+def get_regression_failures(scale_temperatures):
+    """
+    Runs the harness for the default optimized path, with LocationCatalogue.scale_temperatures() replaced.
+
+    :return: Returns the failures, as returned by get_failures().
+    """
+    with mock.patch.object(LocationCatalogue, 'scale_temperatures', scale_temperatures):
+        results, _ = compare(arrow.get('1970-01-01 00:00:00'), arrow.get('1973-12-31 00:00:00'),
+                             paths=['optimized'])
+
+    return get_failures(results)
+
+
+def test_optimized_output_matches_reference_distributions():
+    results, _ = compare(arrow.get('1970-01-01 00:00:00'), arrow.get('1973-12-31 00:00:00'))
+
+    assert_equal(get_failures(results), [])
+
+
+def test_harness_detects_temperatures_from_the_wrong_month():
+    scale_temperatures = LocationCatalogue.scale_temperatures
+
+    def next_month(self, month, uniforms, locations=slice(None)):
+        return scale_temperatures(self, month % 12 + 1, uniforms, locations)
+
+    assert_true(get_regression_failures(next_month))
+
+
+def test_harness_detects_skewed_temperatures():
+    scale_temperatures = LocationCatalogue.scale_temperatures
+
+    def skewed(self, month, uniforms, locations=slice(None)):
+        return scale_temperatures(self, month, uniforms ** 1.2, locations)
+
+    failures = get_regression_failures(skewed)
+
+    assert_true(any(name is None and measure == 'temperature' for _, name, _, measure, _ in failures))
+
+
+def test_statistical_tests_detect_differences():
+    rng = numpy.random.default_rng(1)
+
+    assert_greater(ks_2samp(rng.uniform(0, 1, 2000), rng.uniform(0, 1, 2000))[1], SIGNIFICANCE)
+    assert_greater(SIGNIFICANCE, ks_2samp(rng.uniform(0, 1, 2000), rng.uniform(0.1, 1.1, 2000))[1])
+
+    assert_greater(chi2_2samp([500, 300, 200], [510, 290, 200])[1], SIGNIFICANCE)
+    assert_greater(SIGNIFICANCE, chi2_2samp([500, 300, 200], [300, 500, 200])[1])
+
+    assert_equal([list(counts) for counts in binned_counts(numpy.arange(8), numpy.arange(8))], [[2, 2, 2, 2]] * 2)
+
+
+def main():
+    start_date = arrow.get(sys.argv[1] if len(sys.argv) > 1 else '1970-01-01 00:00:00')
+    end_date = arrow.get(sys.argv[2] if len(sys.argv) > 2 else '1979-12-31 00:00:00')
+
+    results, throughput = compare(start_date, end_date)
+    threshold = get_threshold(results)
+
+    print(f'{"Path":<12}{"Temperature p":>15}{"Pressure p":>12}{"Humidity p":>12}{"Condition p":>13}'
+          f'{"Groups differing":>18}{"Readings/s":>12}')
+    print(f'{"reference":<12}{"":>70}{throughput["reference"]:>12.0f}')
+
+    for path, (groups, combined) in results.items():
+        differing = sum(min(p_values) <= threshold for _, p_values in groups)
+        flag = '' if min(combined) > threshold and not differing else '  << differs'
+
+        print(f'{path:<12}{combined[0]:>15.4f}{combined[1]:>12.4f}{combined[2]:>12.4f}{combined[3]:>13.4f}'
+              f'{differing:>12}/{len(groups):<5}{throughput[path]:>12.0f}{flag}')
+
+    print()
+
+    for path, name, month, measure, p_value in get_failures(results):
+        print(f'{path}: {name or "combined"} {month or ""} {measure} p={p_value:.2e}')
+
+
+if __name__ == '__main__':
+    main()
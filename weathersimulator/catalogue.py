@@ -0,0 +1,186 @@
+"""
+Location catalogue for the weather simulator. This module contains the
+LocationCatalogue class, which loads location records once and stores
+their co-ordinates and monthly temperature ranges in dense arrays so
+temperatures can be derived for many locations and dates in one call.
+
+Location records are validated once, in bulk, when they are loaded, so
+weather conditions can be created for them without repeating the same
+checks for every reading.
+"""
+import json
+import numbers
+import numpy
+import six
+
+from weathersimulator.sampling import location_key
+
+
+class InvalidLocationsError(ValueError):
+    """
+    Raised when one or more location records fail validation. Every problem found is reported, not just the first.
+    """
+
+    def __init__(self, errors):
+        """
+        Instantiates a new instance of the InvalidLocationsError class.
+
+        :param errors: List of (row, field, message) tuples, as returned by validate_locations().
+        """
+        self.errors = errors
+
+        details = '\n'.join(f'row {row}: {field} {message}' for row, field, message in errors)
+        super(InvalidLocationsError, self).__init__(f'{len(errors)} invalid location field(s):\n{details}')
+
+
+def _field_values(location_records, field, types):
+    """
+    Extracts a numeric field from every location record.
+
+    :param location_records: List of location dictionaries.
+    :param field: The name of the field.
+    :param types: The type(s) the field must be an instance of.
+
+    :return: Returns a (values, valid) tuple of arrays. Values that are missing or of the wrong type are NaN.
+    """
+    valid = numpy.array([isinstance(location.get(field), types) for location in location_records], dtype=bool)
+    values = numpy.array([location[field] if is_valid else numpy.nan
+                          for location, is_valid in zip(location_records, valid)], dtype=float)
+
+    return values, valid
+
+
+def _temperature_values(location_records, bound):
+    """
+    Extracts the monthly min or max temperatures from every location record.
+
+    :param location_records: List of location dictionaries.
+    :param bound: Either 'min' or 'max'.
+
+    :return: Returns a (values, valid) tuple. Values is an (n_locations x 12) array, with NaN rows for invalid records.
+    """
+    def is_valid(location):
+        temps = location.get('temps')
+        temps = temps.get(bound) if isinstance(temps, dict) else None
+
+        return isinstance(temps, list) and len(temps) == 12 and \
+            all(isinstance(temp, numbers.Real) for temp in temps)
+
+    valid = numpy.array([is_valid(location) for location in location_records], dtype=bool)
+    values = numpy.array([location['temps'][bound] if location_valid else [numpy.nan] * 12
+                          for location, location_valid in zip(location_records, valid)], dtype=float)
+
+    return values.reshape(len(location_records), 12), valid
+
+
+def validate_locations(location_records):
+    """
+    Validates every location record in one pass. The checks match those made by the WeatherCondition property
+    setters, so weather conditions for valid locations can be created with WeatherCondition.trusted().
+
+    :param location_records: List of location dictionaries, in the format described by schemas/schema.json.
+
+    :return: Returns a list of (row, field, message) tuples, ordered by row. The list is empty when every record is
+        valid.
+    """
+    location_records = list(location_records)
+
+    names_valid = numpy.array([not location.get('name') or isinstance(location['name'], six.string_types)
+                               for location in location_records], dtype=bool)
+    latitudes, latitudes_valid = _field_values(location_records, 'latitude', float)
+    longitudes, longitudes_valid = _field_values(location_records, 'longitude', float)
+    _, elevations_valid = _field_values(location_records, 'elevation', six.integer_types)
+    min_temps, min_temps_valid = _temperature_values(location_records, 'min')
+    max_temps, max_temps_valid = _temperature_values(location_records, 'max')
+
+    # Comparisons against NaN are always False, so missing values and values of the wrong type fail the range checks.
+    checks = [
+        ('name', names_valid, 'must be a non-empty string'),
+        ('latitude', latitudes_valid & (latitudes >= -90) & (latitudes <= 90), 'must be a float between -90 and 90'),
+        ('longitude', longitudes_valid & (longitudes >= -180) & (longitudes <= 180),
+         'must be a float between -180 and 180'),
+        ('elevation', elevations_valid, 'must be an integer'),
+        ('temps', min_temps_valid & max_temps_valid & (min_temps <= max_temps).all(axis=1),
+         'must contain 12 numeric min and max temperatures, with each min no greater than its max'),
+    ]
+
+    errors = [(int(row), field, message) for field, valid, message in checks for row in numpy.flatnonzero(~valid)]
+
+    return sorted(errors, key=lambda error: error[0])
+
+
+class LocationCatalogue(object):
+    """
+    This class represents the set of locations that weather data is generated for. The monthly minimum/maximum
+    temperature records are held as (n_locations x 12) float arrays, indexed by location then month.
+
+    Example:
+        catalogue = LocationCatalogue.from_file('data/locations.json')
+
+        # Derive the random numbers for every location on 1 January 1970, and scale them into each locations
+        # January temperature range.
+        keys = reading_keys(seed, 0, catalogue.keys, 0)
+        temperatures = catalogue.scale_temperatures(1, reading_uniforms(keys)[..., TEMPERATURE_STREAM])
+    """
+
+    def __init__(self, location_records):
+        """
+        Instantiates a new instance of the LocationCatalogue class.
+
+        :param location_records: List of location dictionaries, in the format described by schemas/schema.json.
+
+        :raises InvalidLocationsError: When one or more of the records are invalid.
+        """
+        self.records = list(location_records)
+
+        errors = validate_locations(self.records)
+
+        if errors:
+            raise InvalidLocationsError(errors)
+
+        self.names = [location.get('name') for location in self.records]
+        self.latitudes = numpy.array([location['latitude'] for location in self.records], dtype=float)
+        self.longitudes = numpy.array([location['longitude'] for location in self.records], dtype=float)
+        self.elevations = numpy.array([location['elevation'] for location in self.records], dtype=float)
+        self.keys = numpy.array([location_key(location) for location in self.records], dtype=numpy.uint64)
+
+        shape = (len(self.records), 12)
+        self.min_temps = numpy.array([location['temps']['min'] for location in self.records],
+                                     dtype=float).reshape(shape)
+        self.max_temps = numpy.array([location['temps']['max'] for location in self.records],
+                                     dtype=float).reshape(shape)
+
+    @classmethod
+    def from_file(cls, data_file):
+        """
+        Loads a catalogue from a JSON data file.
+
+        :param data_file: Relative or absolute path to the data file containing location information.
+
+        :return: Returns a LocationCatalogue instance.
+        """
+        with open(data_file) as location_file:
+            return cls(json.load(location_file))
+
+    def __len__(self):
+        """
+        Gets the number of locations in the catalogue.
+
+        :return: The number of locations.
+        """
+        return len(self.records)
+
+    def scale_temperatures(self, month, uniforms, locations=slice(None)):
+        """
+        Scales uniformly distributed random numbers into each locations min/max temperature range for the given month.
+
+        :param month: The calendar month (1 - 12) to scale temperatures for.
+        :param uniforms: Float array of random numbers in the interval [0, 1). The last dimension must be the location.
+        :param locations: Optional slice selecting the locations that uniforms are for (default: every location).
+
+        :return: Returns a float array of temperatures, with the same shape as uniforms.
+        """
+        low = self.min_temps[locations, month - 1]
+        high = self.max_temps[locations, month - 1]
+
+        return low + (high - low) * uniforms
@@ -0,0 +1,213 @@
+"""
+Output pipeline for the weather simulator. This module contains the
+WeatherPipeline class, which separates generating weather data from
+writing it. The caller produces batches of weather conditions, which
+are handed to one or more writer threads through a bounded queue so
+that formatting, compression and I/O overlap with computation.
+"""
+import gzip
+import queue
+import threading
+import time
+
+_SENTINEL = None
+
+
+class PipelineStats(object):
+    """
+    This class holds the metrics gathered during a pipeline run, which can be used to tune the batch size, queue depth
+    and number of writers for the storage being written to.
+
+    A high producer stall means the writers can't keep up (the queue was full), while a high writer stall means the
+    producer can't keep up (the queue was empty). A high turn stall means the writers spent their time waiting for
+    earlier batches to be written, so adding more writers won't help.
+
+    The seed of the run is also recorded, when known, so the output can be reproduced.
+    """
+
+    def __init__(self):
+        """
+        Instantiates a new instance of the PipelineStats class.
+        """
+        self.batches = 0
+        self.rows = 0
+        self.max_queue_depth = 0
+        self.producer_stall = 0.0
+        self.writer_stall = 0.0
+        self.turn_stall = 0.0
+        self.elapsed = 0.0
+        self.seed = None
+
+    def __str__(self):
+        """
+        Override the string representation of this class to simplify reporting the metrics.
+
+        :return: Returns a single line summary of the pipeline metrics.
+        """
+        seed = f'seed={self.seed} ' if self.seed is not None else ''
+
+        return f'{seed}batches={self.batches} rows={self.rows} max_queue_depth={self.max_queue_depth} ' \
+               f'producer_stall={self.producer_stall:.3f}s writer_stall={self.writer_stall:.3f}s ' \
+               f'turn_stall={self.turn_stall:.3f}s elapsed={self.elapsed:.3f}s'
+
+
+class WeatherPipeline(object):
+    """
+    This class writes batches of weather conditions to an output stream using a pool of writer threads.
+
+    Batches are written in the order they were produced, regardless of the number of writers. Each writer formats (and
+    optionally compresses) its batch independently, then waits for its turn to write.
+
+    Example:
+        pipeline = WeatherPipeline(sys.stdout, queue_depth=8, writers=2)
+        stats = pipeline.run(batches)
+
+        print(stats, file=sys.stderr)
+    """
+
+    def __init__(self, output, queue_depth=8, writers=1, formatter=str,  # pylint: disable=R0913
+                 compresslevel=None):
+        """
+        Instantiates a new instance of the WeatherPipeline class.
+
+        :param output: File-like object that the formatted weather conditions are written to.
+        :param queue_depth: The maximum number of batches waiting to be written. Must be at least 1.
+        :param writers: The number of writer threads. Must be at least 1.
+        :param formatter: Function that converts a single batch item into an output row. Defaults to str().
+        :param compresslevel: Optional gzip compression level (0 - 9). When given, each batch is compressed into its
+            own gzip member by the writer threads, and output must be opened in binary mode. The members are
+            concatenated, which gzip readers treat as a single stream.
+        """
+        if queue_depth < 1:
+            raise ValueError('queue_depth must be at least 1')
+
+        if writers < 1:
+            raise ValueError('writers must be at least 1')
+
+        self.output = output
+        self.queue_depth = queue_depth
+        self.writers = writers
+        self.formatter = formatter
+        self.compresslevel = compresslevel
+
+        self.__queue = None
+        self.__turn = None
+        self.__next_batch = 0
+        self.__error = None
+        self.__stats = None
+
+    def run(self, batches):
+        """
+        Writes each batch to the output stream. The batches are consumed in the calling thread, and written by the
+        writer threads.
+
+        :param batches: Iterable of batches, where each batch is a list of items that the formatter converts into a
+            single output row (WeatherCondition instances by default).
+
+        :return: Returns a PipelineStats instance describing the run.
+        """
+        self.__queue = queue.Queue(maxsize=self.queue_depth)
+        self.__turn = threading.Condition()
+        self.__next_batch = 0
+        self.__error = None
+        self.__stats = PipelineStats()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=self.__write) for _ in range(self.writers)]
+
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        try:
+            for sequence, batch in enumerate(batches):
+                self.__put((sequence, batch))
+                self.__stats.batches += 1
+                self.__stats.rows += len(batch)
+                self.__stats.max_queue_depth = max(self.__stats.max_queue_depth, self.__queue.qsize())
+        finally:
+            for _ in threads:
+                self.__put(_SENTINEL)
+
+            for thread in threads:
+                thread.join()
+
+        self.__stats.elapsed = time.perf_counter() - started
+
+        if self.__error:
+            raise self.__error
+
+        return self.__stats
+
+    def __put(self, item):
+        """
+        Adds an item to the queue, recording how long the producer was blocked waiting for space.
+
+        :param item: The (sequence, batch) tuple, or the sentinel used to stop a writer.
+        """
+        # Writers keep draining the queue after a failure, so there is no risk of blocking forever here.
+        if self.__error and item is not _SENTINEL:
+            raise self.__error
+
+        stalled = time.perf_counter()
+        self.__queue.put(item)
+        self.__stats.producer_stall += time.perf_counter() - stalled
+
+    def __write(self):
+        """
+        Writer thread. Formats and compresses batches taken from the queue, then writes them to the output stream in
+        order. Only the write itself is done while holding the lock.
+        """
+        while True:
+            stalled = time.perf_counter()
+            item = self.__queue.get()
+            waited = time.perf_counter() - stalled
+
+            with self.__turn:
+                self.__stats.writer_stall += waited
+
+            if item is _SENTINEL:
+                return
+
+            sequence, batch = item
+
+            try:
+                formatted = ''.join(self.formatter(item) + '\n' for item in batch)
+
+                if self.compresslevel is not None:
+                    formatted = gzip.compress(formatted.encode('utf-8'), compresslevel=self.compresslevel)
+            except Exception as error:  # pylint: disable=W0703
+                formatted = None
+                self.__fail(error)
+
+            # Release the readings while waiting for this batch's turn, and while waiting for the next batch.
+            del item, batch
+
+            with self.__turn:
+                stalled = time.perf_counter()
+
+                while self.__next_batch != sequence and not self.__error:
+                    self.__turn.wait()
+
+                self.__stats.turn_stall += time.perf_counter() - stalled
+
+                if formatted is not None and not self.__error:
+                    try:
+                        self.output.write(formatted)
+                    except Exception as error:  # pylint: disable=W0703
+                        self.__fail(error)
+
+                self.__next_batch += 1
+                self.__turn.notify_all()
+
+    def __fail(self, error):
+        """
+        Records the first error raised by a writer, and wakes any writers waiting for their turn.
+
+        :param error: The exception raised by the writer.
+        """
+        with self.__turn:
+            if not self.__error:
+                self.__error = error
+
+            self.__turn.notify_all()
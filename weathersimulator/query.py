@@ -0,0 +1,116 @@
+"""
+Random access to generated weather data. This module can be used to
+compute the weather condition for a single location at a single point
+in time, without generating the readings that precede it. The results
+are identical to the readings produced by generate_weather.py for the
+same seed.
+"""
+import functools
+import arrow
+
+from weathersimulator.catalogue import LocationCatalogue
+from weathersimulator.sampling import TEMPERATURE_STREAM, UniformStream, epoch_seconds, reading_keys, \
+    reading_uniforms
+from weathersimulator.utils.timezones import get_timezone
+from weathersimulator.weather import WeatherCondition
+
+CACHE_SIZE = 4096
+
+
+def create_weather_condition(location, temperature, datetime, key, uniforms):
+    """
+    Creates and calculates the weather condition for a single reading. The location is not validated again, so it
+    must come from a LocationCatalogue.
+
+    :param location: Location dictionary, in the format described by schemas/schema.json.
+    :param temperature: The temperature, in degrees celsius.
+    :param datetime: The local date and time of the reading.
+    :param key: The reading key, as returned by reading_keys().
+    :param uniforms: The random numbers derived for the reading, as returned by reading_uniforms().
+
+    :return: Returns a calculated WeatherCondition instance.
+    """
+    weather_condition = WeatherCondition.trusted(
+        name=location.get('name'),
+        latitude=location['latitude'],
+        longitude=location['longitude'],
+        elevation=location['elevation'],
+        temperature=float(temperature),
+        datetime=datetime,
+        rng=UniformStream(key, uniforms)
+    )
+
+    weather_condition.calculate()
+
+    return weather_condition
+
+
+def weather_at(location, timestamp, seed, member=0, timezone=None):
+    """
+    Computes the weather condition for a location at a point in time. The result only depends on the arguments, so
+    the same reading is always returned for the same location, timestamp, seed and ensemble member.
+
+    Example:
+        wc = weather_at(location, '1970-01-15 00:00:00', seed=42)
+        print(wc)
+
+    :param location: Location dictionary, in the format described by schemas/schema.json.
+    :param timestamp: The time of the reading. Anything accepted by arrow.get(), naive values are treated as UTC.
+    :param seed: The integer seed of the run.
+    :param member: Optional ensemble member id (default: 0).
+    :param timezone: Optional timezone of the location. When omitted, it is resolved from the locations co-ordinates.
+
+    :return: Returns a calculated WeatherCondition instance.
+
+    :raises InvalidLocationsError: When the location is invalid.
+    """
+    timestamp = arrow.get(timestamp)
+    catalogue = LocationCatalogue([location])
+
+    keys = reading_keys(seed, member, catalogue.keys, epoch_seconds(timestamp))
+    uniforms = reading_uniforms(keys)
+    temperatures = catalogue.scale_temperatures(timestamp.to('utc').month, uniforms[..., TEMPERATURE_STREAM])
+
+    timezone = timezone or get_timezone(location['latitude'], location['longitude'])
+
+    return create_weather_condition(location, temperatures[0], timestamp.astimezone(timezone), keys[0], uniforms[0])
+
+
+def cached_weather_at(location, timestamp, seed, member=0, timezone=None):
+    """
+    Cached version of weather_at(), for locations and times that are requested repeatedly. Up to CACHE_SIZE of the
+    most recently used readings are kept.
+
+    The returned WeatherCondition instance is shared between callers, so it must not be modified.
+
+    :param location: Location dictionary, in the format described by schemas/schema.json.
+    :param timestamp: The time of the reading. Anything accepted by arrow.get(), naive values are treated as UTC.
+    :param seed: The integer seed of the run.
+    :param member: Optional ensemble member id (default: 0).
+    :param timezone: Optional timezone of the location. When omitted, it is resolved from the locations co-ordinates.
+
+    :return: Returns a calculated WeatherCondition instance.
+    """
+    frozen_location = (location['name'], location['latitude'], location['longitude'], location['elevation'],
+                       tuple(location['temps']['min']), tuple(location['temps']['max']))
+
+    return _cached_weather_at(frozen_location, arrow.get(timestamp), seed, member, timezone)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _cached_weather_at(frozen_location, timestamp, seed, member, timezone):  # pylint: disable=R0913
+    name, latitude, longitude, elevation, min_temps, max_temps = frozen_location
+
+    location = {
+        'name': name,
+        'latitude': latitude,
+        'longitude': longitude,
+        'elevation': elevation,
+        'temps': {'min': list(min_temps), 'max': list(max_temps)}
+    }
+
+    return weather_at(location, timestamp, seed, member, timezone)
+
+
+cached_weather_at.cache_info = _cached_weather_at.cache_info
+cached_weather_at.cache_clear = _cached_weather_at.cache_clear
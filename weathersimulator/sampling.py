@@ -0,0 +1,164 @@
+"""
+Counter-based random numbers for the weather simulator. Rather than
+drawing from a sequential generator, every random number is derived
+from a hash of the seed, ensemble member, location and timestamp of the
+reading it belongs to. Any reading can therefore be reproduced on its
+own, without generating the readings that precede it.
+"""
+import hashlib
+import json
+import numpy
+
+# Stream 0 of each reading is used for the temperature. The remaining four streams are consumed, in order, by the calls
+# WeatherCondition makes to rng.uniform() - the pressure deviation drawn when it is created, the pressure deviation drawn
+# again by calculate(), then the minimum temperature and the wet bulb temperature.
+TEMPERATURE_STREAM = 0
+READING_STREAMS = 5
+
+_MASK = 0xFFFFFFFFFFFFFFFF
+_GOLDEN_GAMMA = numpy.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(values):
+    """
+    Applies the SplitMix64 finaliser to an array of 64-bit unsigned integers. The array is updated in place, so only
+    one temporary of the same size is needed.
+
+    :param values: numpy uint64 array, which is overwritten. Arithmetic wraps modulo 2^64.
+
+    :return: Returns values, now holding well mixed uint64 values.
+    """
+    values ^= values >> numpy.uint64(30)
+    values *= numpy.uint64(0xBF58476D1CE4E5B9)
+    values ^= values >> numpy.uint64(27)
+    values *= numpy.uint64(0x94D049BB133111EB)
+    values ^= values >> numpy.uint64(31)
+
+    return values
+
+
+def _to_uint64(values):
+    """
+    Converts integers (including negative timestamps) into a uint64 array, wrapping modulo 2^64.
+
+    :param values: Integer or array-like of integers.
+
+    :return: Returns a numpy uint64 array with at least one dimension.
+    """
+    values = numpy.atleast_1d(values)
+
+    # Python integers that don't fit in 64 bits end up as objects, so mask them down first.
+    if values.dtype == object:
+        return numpy.array([int(value) & _MASK for value in values.ravel()], dtype=numpy.uint64).reshape(values.shape)
+
+    return values.astype(numpy.uint64)
+
+
+def epoch_seconds(timestamp):
+    """
+    Converts a timezone aware timestamp into whole seconds since the Unix epoch.
+
+    :param timestamp: An arrow.Arrow or timezone aware datetime.
+
+    :return: Returns the number of seconds since 1970-01-01T00:00:00Z.
+    """
+    return int(getattr(timestamp, 'datetime', timestamp).timestamp())
+
+
+def location_key(location):
+    """
+    Derives a stable 64-bit key from a locations name, position and elevation.
+
+    :param location: Location dictionary, in the format described by schemas/schema.json.
+
+    :return: Returns the key as an integer.
+    """
+    identity = json.dumps([location.get('name'), location['latitude'], location['longitude'], location['elevation']])
+
+    return int.from_bytes(hashlib.blake2b(identity.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def reading_keys(seed, members, location_keys, timestamps):
+    """
+    Derives the key of each reading. The arguments are broadcast against each other, so keys for every combination
+    of member, location and timestamp can be derived in one call.
+
+    :param seed: The integer seed of the run.
+    :param members: Ensemble member id(s).
+    :param location_keys: Location key(s), as returned by location_key().
+    :param timestamps: Reading time(s), in seconds since the Unix epoch.
+
+    :return: Returns a uint64 array of reading keys.
+    """
+    keys = _mix(_to_uint64(seed) + _GOLDEN_GAMMA)
+
+    for values in (members, location_keys, timestamps):
+        keys = _mix(keys ^ _to_uint64(values))
+
+    return keys
+
+
+def reading_uniforms(keys, streams=READING_STREAMS, start=0):
+    """
+    Derives uniformly distributed random numbers for each reading key.
+
+    :param keys: uint64 array of reading keys, as returned by reading_keys().
+    :param streams: The number of random numbers to derive per key.
+    :param start: The index of the first stream.
+
+    :return: Returns a float array in the interval [0, 1), with shape keys.shape + (streams,).
+    """
+    stream_ids = numpy.arange(start, start + streams, dtype=numpy.uint64) * _GOLDEN_GAMMA
+    values = _mix(numpy.asarray(keys, dtype=numpy.uint64)[..., None] ^ stream_ids)
+
+    # Use the upper 53 bits, which is the precision of a double.
+    values >>= numpy.uint64(11)
+    uniforms = values.astype(float)
+    del values
+
+    uniforms *= 1.0 / (1 << 53)
+
+    return uniforms
+
+
+class UniformStream(object):
+    """
+    This class provides the uniform() method expected by WeatherCondition, returning the random numbers derived for a
+    single reading. Streams are consumed in order, starting after the temperature stream. Once the precomputed values
+    are exhausted, further values are derived from the reading key on demand.
+
+    Example:
+        keys = reading_keys(seed, 0, location_key(location), epoch_seconds(timestamp))
+        uniforms = reading_uniforms(keys)
+
+        wc = WeatherCondition(..., rng=UniformStream(keys[0], uniforms[0]))
+    """
+
+    def __init__(self, key, values=()):
+        """
+        Instantiates a new instance of the UniformStream class.
+
+        :param key: The reading key.
+        :param values: Optional precomputed values for the reading, as returned by reading_uniforms().
+        """
+        self.__key = key
+        self.__values = values
+        self.__stream = TEMPERATURE_STREAM + 1
+
+    def uniform(self, low, high):
+        """
+        Gets the next random number for the reading.
+
+        :param low: Lower boundary of the output interval.
+        :param high: Upper boundary of the output interval.
+
+        :return: Returns a float between low and high.
+        """
+        if self.__stream < len(self.__values):
+            value = self.__values[self.__stream]
+        else:
+            value = reading_uniforms(self.__key, streams=1, start=self.__stream)[..., 0].item()
+
+        self.__stream += 1
+
+        return low + (high - low) * float(value)
@@ -0,0 +1,27 @@
+"""
+Timezone lookups used by the weather simulator.
+"""
+import functools
+import pytz
+
+from timezonefinder import TimezoneFinder
+
+_TIMEZONE_FINDER = None
+
+
+@functools.lru_cache(maxsize=None)
+def get_timezone(latitude, longitude):
+    """
+    Resolves the timezone at the given co-ordinates. Results are cached, as the lookup is relatively expensive.
+
+    :param latitude: The latitude, between -90 and 90 degrees.
+    :param longitude: The longitude, between -180 and 180 degrees.
+
+    :return: Returns a pytz timezone.
+    """
+    global _TIMEZONE_FINDER  # pylint: disable=W0603
+
+    if _TIMEZONE_FINDER is None:
+        _TIMEZONE_FINDER = TimezoneFinder()
+
+    return pytz.timezone(_TIMEZONE_FINDER.timezone_at(lng=longitude, lat=latitude))
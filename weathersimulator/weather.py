@@ -4,9 +4,9 @@ WeatherCondition class which can be leveraged to auto-generate
 believable weather data for a specific location at a specific
 date and time.
 """
-from random import uniform
 import numbers
 import math
+import random
 import arrow
 import six
 
@@ -54,7 +54,8 @@ class WeatherCondition(object):  # pylint: disable=R0902
     """
     __WETBULB_MAX_DEVIATION = 8
 
-    def __init__(self, latitude, longitude, elevation, temperature, datetime=None, name=None):  # pylint: disable=R0913
+    def __init__(self, latitude, longitude, elevation, temperature, datetime=None, name=None,  # pylint: disable=R0913
+                 rng=None):
         """
         Instantiates a new instance of the WeatherCondition class, which can
         be used to generate believable weather data for any given date.
@@ -65,24 +66,56 @@ class WeatherCondition(object):  # pylint: disable=R0902
         :param elevation: The elevation in metres.
         :param temperature: The temperature in degrees celsius.
         :param datetime: The local date and time that the weather condition is for. Must be in ISO8601 format.
+        :param rng: Optional random number generator providing a uniform(low, high) method, such as random.Random or
+            numpy.random.Generator. Defaults to the random module.
         """
-        # Initialising attributes here to keep pylint happy. They are initialised properly during the calls to their
-        # respective properties defined a few lines below...
-        self.__name = None
-        self.__humidity = None
-        self.__elevation = None
-        self.__latitude = None
-        self.__longitude = None
-        self.__temperature = None
-        self.__min_temperature = None
-        self.__wetbulb_temp = None
-
+        # Validate the arguments by passing them through their property setters, before anything is calculated.
         self.name = name
         self.latitude = latitude
         self.longitude = longitude
         self.elevation = elevation
         self.temperature = temperature
 
+        self.__initialise(self.latitude, self.longitude, self.elevation, self.temperature, datetime, self.name, rng)
+
+    @classmethod
+    def trusted(cls, latitude, longitude, elevation, temperature, datetime=None, name=None,  # pylint: disable=R0913
+                rng=None):
+        """
+        Creates a new instance of the WeatherCondition class without validating the arguments. This avoids repeating
+        the property setter checks for every reading, and should only be used for locations that have already been
+        validated (eg: by weathersimulator.catalogue.validate_locations()).
+
+        :param name: Optional name of the location.
+        :param latitude: The locations latitude. Must be a float, between -90 and 90 degrees.
+        :param longitude: The locations latitude. Must be a float, between -180 and 180 degress.
+        :param elevation: The elevation in metres. Must be an integer.
+        :param temperature: The temperature in degrees celsius.
+        :param datetime: The local date and time that the weather condition is for.
+        :param rng: Optional random number generator providing a uniform(low, high) method.
+
+        :return: Returns a new WeatherCondition instance.
+        """
+        weather_condition = cls.__new__(cls)
+        weather_condition.__initialise(latitude, longitude, elevation, temperature, datetime, name, rng)
+
+        return weather_condition
+
+    def __initialise(self, latitude, longitude, elevation, temperature, datetime, name, rng):  # pylint: disable=R0913
+        """
+        Initialises the instance attributes. Shared by __init__() and trusted(), so the arguments must already have
+        been validated.
+        """
+        self.__name = name
+        self.__humidity = None
+        self.__elevation = elevation
+        self.__latitude = latitude
+        self.__longitude = longitude
+        self.__temperature = temperature
+        self.__min_temperature = None
+        self.__wetbulb_temp = None
+        self.__rng = rng if rng is not None else random
+
         self.__calculate_pressure()
 
         self.datetime = datetime if datetime else arrow.now()
@@ -160,7 +193,7 @@ class WeatherCondition(object):  # pylint: disable=R0902
 
         :param latitude: The latitude. Must be a numeric value between -90 and 90.
         """
-        if not isinstance(latitude, float) or -90 < latitude > 90:
+        if not isinstance(latitude, float) or not -90 <= latitude <= 90:
             raise TypeError('latitude must be a float between -90 and 90')
 
         self.__latitude = latitude
@@ -181,7 +214,7 @@ class WeatherCondition(object):  # pylint: disable=R0902
 
         :param longitude: The longitude. This must be a numeric value between -180 and 180.
         """
-        if not isinstance(longitude, float) or -180 < longitude > 180:
+        if not isinstance(longitude, float) or not -180 <= longitude <= 180:
             raise TypeError('longitude must be a float between -180 and 180')
 
         self.__longitude = longitude
@@ -262,7 +295,7 @@ class WeatherCondition(object):  # pylint: disable=R0902
         """
         # Allow air pressure to fluctuate +/- 20%. This will cause humidity to increase/decrease, impacting whether it
         # is sunny, snowy or rainy. In theory this should make the generated results more believable.
-        self.__deviation = uniform(0.8, 1.2)
+        self.__deviation = self.__rng.uniform(0.8, 1.2)
 
         pressure = 101325.0  # Default air pressure at sea level
 
@@ -302,8 +335,9 @@ class WeatherCondition(object):  # pylint: disable=R0902
         #
         # Table at https://www.eduplace.com/science/hmxs/es/pdf/5rs_3_2-3.pdf used to validate the correctness of the
         # humidity results stops at a 10 degrees difference (there may be some variation in results due to rounding).
-        self.__min_temperature = uniform(self.temperature - WeatherCondition.__WETBULB_MAX_DEVIATION, self.temperature)
-        self.__wetbulb_temp = uniform(self.min_temperature, self.temperature)
+        self.__min_temperature = self.__rng.uniform(self.temperature - WeatherCondition.__WETBULB_MAX_DEVIATION,
+                                                    self.temperature)
+        self.__wetbulb_temp = self.__rng.uniform(self.min_temperature, self.temperature)
 
         # saturation vapour pressure for dry bulb (Tentens equation)
         dry_temp_in_k = self.__celsius_to_kelvin(self.temperature)